@@ -0,0 +1,75 @@
+# uv run python bench_import.py
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+# Modules that batch jobs and workers import, and heavy dependencies they must
+# only load on demand.
+HEADLESS_MODULES = [
+    "utils",
+    "utils_metrics",
+    "utils_stream",
+    "utils_optimize",
+    "utils_pool",
+    "utils_jobs",
+    "service",
+]
+DEFERRED_MODULES = {"streamlit", "plotly", "millify", "pyarrow"}
+# Required dependencies whose import cost is outside our control; they are
+# loaded before timing so the budget measures each module's own cost.
+PRELOADED_MODULES = ["polars", "numpy"]
+BUDGET_MS = 75.0
+
+
+def cold_import(module: str, preload: list[str] = ()) -> tuple[float, set[str]]:
+    """
+    Import `module` in a fresh interpreter after importing `preload`; return
+    (ms spent on `module`, top-level modules loaded).
+    """
+    code = (
+        "import sys, time\n"
+        + "".join(f"import {name}\n" for name in preload)
+        + "t = time.perf_counter()\n"
+        + f"import {module}\n"
+        "print((time.perf_counter() - t) * 1000)\n"
+        "print(' '.join({m.split('.')[0] for m in sys.modules}))\n"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout.splitlines()
+    return float(out[0]), set(out[1].split())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold import-time budget check")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=BUDGET_MS,
+        help="Allowed import time per module, with polars and numpy loaded",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for name in PRELOADED_MODULES:
+        ms = statistics.median(cold_import(name)[0] for _ in range(args.repeat))
+        print(f"     {name:<16} {ms:7.1f} ms (dependency, not budgeted)")
+
+    failed = False
+    for module in HEADLESS_MODULES:
+        runs = [cold_import(module, PRELOADED_MODULES) for _ in range(args.repeat)]
+        median_ms = statistics.median(ms for ms, _ in runs)
+        heavy = sorted(runs[0][1] & DEFERRED_MODULES)
+        ok = median_ms <= args.budget_ms and not heavy
+        failed |= not ok
+        print(
+            f"{'ok  ' if ok else 'FAIL'} {module:<16} {median_ms:7.1f} ms"
+            + (f"  imports {', '.join(heavy)}" if heavy else "")
+        )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# uv run python bench_service.py --requests 2000 --concurrency 1 8 32 128
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from service import ProjectionBatcher, ProjectionService, start_server
+
+
+def random_scenario(rng: random.Random, n_distinct: int) -> dict:
+    # draw from `n_distinct` parameter sets so cache hits are controllable
+    i = rng.randrange(n_distinct)
+    return {
+        "property_price": 4_000_000 + 1_000 * i,
+        "annual_property_appreciation": 0.03,
+        "loan_amount": 2_500_000,
+        "annual_interest_rate": 0.05,
+        "loan_term_years": 25,
+        "initial_stock_investment": 100_000,
+        "monthly_stock_investment": 10_000,
+        "annual_stock_return": 0.07,
+        "time_horizon_years": 15,
+    }
+
+
+async def client(
+    host: str, port: int, path: str, bodies: list[dict], latencies: list[float]
+) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    for body in bodies:
+        raw = json.dumps(body).encode()
+        start = time.perf_counter()
+        writer.write(
+            f"POST {path} HTTP/1.1\r\nHost: {host}\r\n"
+            f"Content-Length: {len(raw)}\r\n\r\n".encode() + raw
+        )
+        await writer.drain()
+        headers = {}
+        status = await reader.readline()
+        while (line := await reader.readline()) != b"\r\n":
+            name, _, value = line.decode().partition(":")
+            headers[name.strip().lower()] = value.strip()
+        await reader.readexactly(int(headers["content-length"]))
+        latencies.append(time.perf_counter() - start)
+        if not status.startswith(b"HTTP/1.1 200"):
+            raise RuntimeError(status.decode())
+    writer.close()
+
+
+async def run_level(
+    host: str, port: int, path: str, n_requests: int, concurrency: int, n_distinct: int
+) -> dict:
+    rng = random.Random(concurrency)
+    bodies = [random_scenario(rng, n_distinct) for _ in range(n_requests)]
+    latencies: list[float] = []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[
+            client(host, port, path, bodies[i::concurrency], latencies)
+            for i in range(concurrency)
+        ]
+    )
+    elapsed = time.perf_counter() - start
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "concurrency": concurrency,
+        "p50_ms": quantiles[49] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+        "rps": n_requests / elapsed,
+    }
+
+
+async def main(args) -> None:
+    service = ProjectionService(
+        ProjectionBatcher(window_ms=args.window_ms, cache_size=args.cache_size)
+    )
+    server = await start_server(args.host, args.port, service)
+    async with server:
+        print(f"{'concurrency':>11} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+        for concurrency in args.concurrency:
+            service.batcher.cache.clear()
+            result = await run_level(
+                args.host,
+                args.port,
+                args.path,
+                args.requests,
+                concurrency,
+                args.distinct,
+            )
+            print(
+                f"{result['concurrency']:>11} {result['p50_ms']:>8.2f} "
+                f"{result['p99_ms']:>8.2f} {result['rps']:>8.0f}"
+            )
+        stats = await service.handle("GET", "/stats", {})
+        print(f"batches: {stats['batches']}, cache hits: {stats['cache_hits']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the projection service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--path", default="/summary")
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--distinct", type=int, default=500)
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--cache-size", type=int, default=4096)
+    asyncio.run(main(parser.parse_args()))
@@ -7,7 +7,7 @@ import streamlit as st
 from millify import millify
 
 from utils import (
-    combined_property_and_stocks,
+    combined_property_and_stocks_with_yearly,
 )
 from utils_dashboard import scenario_end_stats, scenario_sliders, stats_components
 
@@ -54,6 +54,22 @@ def main():
         value=4.0,
         step=0.1,
     )
+    annual_contribution_growth = st.sidebar.slider(
+        label="Annual growth of stock investment (%)",
+        min_value=0.0,
+        max_value=10.0,
+        value=0.0,
+        step=0.1,
+        help="E.g. salary growth",
+    )
+    annual_cost_growth = st.sidebar.slider(
+        label="Annual growth of other property costs (%)",
+        min_value=0.0,
+        max_value=10.0,
+        value=0.0,
+        step=0.1,
+        help="E.g. inflation",
+    )
     rentefradrag = st.sidebar.checkbox(
         label="Include rentefradrag (22% tax deduction on interest)",
         value=True,
@@ -90,7 +106,7 @@ def main():
     # --- Calculate projections ---
 
     # Scenario 1: Current house + stocks
-    scenario1_df = combined_property_and_stocks(
+    scenario1_df, scenario1_yearly = combined_property_and_stocks_with_yearly(
         property_price=property_price_1,
         annual_property_appreciation=annual_property_appreciation / 100,
         loan_amount=loan_amount_1,
@@ -102,10 +118,13 @@ def main():
         time_horizon_years=time_horizon_years,
         annual_inflation=annual_inflation / 100,
         rentefradrag=rentefradrag,
+        monthly_other_property_costs=monthly_other_property_costs_1,
+        annual_contribution_growth=annual_contribution_growth / 100,
+        annual_cost_growth=annual_cost_growth / 100,
     )
 
     # Scenario 2: Bigger house
-    scenario2_df = combined_property_and_stocks(
+    scenario2_df, scenario2_yearly = combined_property_and_stocks_with_yearly(
         property_price=property_price_2,
         annual_property_appreciation=annual_property_appreciation / 100,
         loan_amount=loan_amount_2,
@@ -117,13 +136,14 @@ def main():
         time_horizon_years=time_horizon_years,
         annual_inflation=annual_inflation / 100,
         rentefradrag=rentefradrag,
+        monthly_other_property_costs=monthly_other_property_costs_2,
+        annual_contribution_growth=annual_contribution_growth / 100,
+        annual_cost_growth=annual_cost_growth / 100,
     )
     # --- Show scenario stats ---
     with col1:
         stats_components(
             df_scenario=scenario1_df,
-            monthly_stock_investment=monthly_stock_investment_1,
-            monthly_other_property_costs=monthly_other_property_costs_1,
             scenario="A",
             property_price=property_price_1,
             loan_amount=loan_amount_1,
@@ -132,8 +152,6 @@ def main():
     with col2:
         stats_components(
             df_scenario=scenario2_df,
-            monthly_stock_investment=monthly_stock_investment_2,
-            monthly_other_property_costs=monthly_other_property_costs_2,
             scenario="B",
             property_price=property_price_2,
             loan_amount=loan_amount_2,
@@ -188,14 +206,11 @@ def main():
     scenario_end_stats(df_scenario=scenario2_df, scenario="B")
 
     # --- Show detailed tables ---
-    st.subheader("Raw data tables - yearly display")
+    st.subheader("Raw data tables - yearly totals and end-of-year values")
 
-    numeric_cols = scenario1_df.select(cs.numeric()).columns
+    numeric_cols = scenario1_yearly.select(cs.numeric()).columns
 
     st.write("**Scenario A:**")
-    scenario1_yearly = scenario1_df.filter(
-        (pl.col("month") % 12 == 0) | (pl.col("month") == 1)
-    )
     st.dataframe(
         scenario1_yearly,
         column_config={
@@ -204,9 +219,6 @@ def main():
     )
 
     st.write("**Scenario B:**")
-    scenario2_yearly = scenario2_df.filter(
-        (pl.col("month") % 12 == 0) | (pl.col("month") == 1)
-    )
     st.dataframe(
         scenario2_yearly,
         column_config={
@@ -31,6 +31,14 @@ def main():
         value=15000,
         step=500,
     )
+    annual_contribution_growth = st.sidebar.slider(
+        label="Annual contribution growth (%)",
+        min_value=0.0,
+        max_value=10.0,
+        value=0.0,
+        step=0.1,
+        help="E.g. salary growth",
+    )
     annual_return = st.sidebar.slider(
         label="Annual return (%)", min_value=0.0, max_value=20.0, value=7.0, step=0.05
     )
@@ -50,6 +58,7 @@ def main():
         annual_return / 100,  # convert % to decimal
         years,
         annual_inflation / 100,  # convert % to decimal
+        annual_contribution_growth=annual_contribution_growth / 100,
     )
 
     # --- Show stats ---
@@ -82,7 +91,9 @@ def main():
     st.plotly_chart(fig, use_container_width=True)
 
     # --- Show table ---
-    st.subheader("Yearly Projection")
+    # Point-in-time snapshots at months 0, 12, 24, ...; unlike the yearly
+    # rollup in dashboard_compare, monthly flows are not summed per year.
+    st.subheader("Yearly Snapshots")
     df_yearly = df.filter(pl.col("month") % 12 == 0)
     st.dataframe(df_yearly, width=1800)
 
@@ -116,7 +116,9 @@ def main():
     st.plotly_chart(fig, use_container_width=True)
 
     # --- Show table ---
-    st.subheader("Yearly Projection")
+    # Point-in-time snapshots at months 0, 12, 24, ...; unlike the yearly
+    # rollup in dashboard_compare, monthly flows are not summed per year.
+    st.subheader("Yearly Snapshots")
     df_yearly = df.filter(pl.col("month") % 12 == 0)
     st.dataframe(df_yearly, width=1800)
 
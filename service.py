@@ -0,0 +1,312 @@
+# uv run python service.py --port 8765
+
+import argparse
+import asyncio
+import inspect
+import io
+import json
+import math
+from collections import OrderedDict
+
+import polars as pl
+
+from utils import (
+    combined_property_and_stocks,
+    combined_property_and_stocks_batch,
+    monthly_cost_summary,
+)
+from utils_metrics import REGISTRY
+
+ARROW_MIME = "application/vnd.apache.arrow.stream"
+PARAMS = inspect.signature(combined_property_and_stocks).parameters
+MAX_HORIZON_YEARS = 100
+MORTGAGE_COLUMNS = [
+    "month",
+    "year",
+    "loan_payment",
+    "interest",
+    "tax_deduction",
+    "net_cost",
+    "loan_balance",
+    "principal_cum",
+    "interest_cum",
+]
+
+
+class RequestError(Exception):
+    pass
+
+
+def scenario_key(body: dict) -> tuple:
+    """Validate a JSON body against `combined_property_and_stocks` and freeze it."""
+    unknown = set(body) - set(PARAMS)
+    if unknown:
+        raise RequestError(f"Unknown parameters: {sorted(unknown)}")
+    values = []
+    for name, param in PARAMS.items():
+        if name not in body:
+            if param.default is inspect.Parameter.empty:
+                raise RequestError(f"Missing parameter: {name}")
+            values.append(param.default)
+            continue
+        value = body[name]
+        if param.annotation is bool:
+            valid = isinstance(value, bool)
+        else:
+            # json.loads accepts NaN and Infinity
+            valid = (
+                isinstance(value, (int, float))
+                and not isinstance(value, bool)
+                and math.isfinite(value)
+            )
+            if valid and param.annotation is int:
+                valid = float(value).is_integer()
+        if not valid:
+            raise RequestError(f"Invalid {param.annotation.__name__} for {name}")
+        values.append(param.annotation(value))
+    key = dict(zip(PARAMS, values))
+    if key["loan_term_years"] < 1:
+        raise RequestError("loan_term_years must be at least 1")
+    if not 1 <= key["time_horizon_years"] <= MAX_HORIZON_YEARS:
+        raise RequestError(
+            f"time_horizon_years must be between 1 and {MAX_HORIZON_YEARS}"
+        )
+    return tuple(values)
+
+
+def mortgage_key(body: dict) -> tuple:
+    """Mortgage-only request as a scenario without property or stocks."""
+    if "loan_term_years" not in body:
+        raise RequestError("Missing parameter: loan_term_years")
+    return scenario_key(
+        {
+            "property_price": 0.0,
+            "annual_property_appreciation": 0.0,
+            "initial_stock_investment": 0.0,
+            "monthly_stock_investment": 0.0,
+            "annual_stock_return": 0.0,
+            "time_horizon_years": body["loan_term_years"],
+            **body,
+        }
+    )
+
+
+class ProjectionBatcher:
+    """
+    Collects concurrent projection requests for up to `window_ms` (or
+    `max_batch` distinct scenarios) and runs them as one call to
+    `combined_property_and_stocks_batch`. Results are kept in an LRU cache
+    keyed by the full parameter tuple.
+
+    Each entry is a whole monthly frame at roughly 160 bytes per month, so
+    besides `cache_size` entries the cache is capped at `cache_rows` months
+    in total (about 160 MB by default); 4096 entries at a 100-year horizon
+    would otherwise hold about 800 MB.
+    """
+
+    def __init__(
+        self,
+        window_ms: float = 2.0,
+        max_batch: int = 512,
+        cache_size: int = 4096,
+        cache_rows: int = 1_000_000,
+    ):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.cache_size = cache_size
+        self.cache_rows = cache_rows
+        self.cache: OrderedDict[tuple, pl.DataFrame] = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.batches = 0
+        self._pending: dict[tuple, asyncio.Future] = {}
+        self._flush_handle: asyncio.TimerHandle | None = None
+        # the event loop only keeps weak references to running tasks
+        self._tasks: set[asyncio.Task] = set()
+
+    async def get(self, key: tuple) -> pl.DataFrame:
+        if key in self.cache:
+            self.cache_hits += 1
+            REGISTRY.inc("cache_hits_total", cache="projection")
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        self.cache_misses += 1
+        REGISTRY.inc("cache_misses_total", cache="projection")
+        if key not in self._pending:
+            loop = asyncio.get_running_loop()
+            self._pending[key] = loop.create_future()
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(self.window, self._flush)
+        return await asyncio.shield(self._pending[key])
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        if pending:
+            task = asyncio.create_task(self._run(pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, pending: dict[tuple, asyncio.Future]) -> None:
+        # every waiter must be resolved, whatever happens to the batch
+        try:
+            keys = list(pending)
+            params = pl.DataFrame([dict(zip(PARAMS, key)) for key in keys])
+            df = await asyncio.to_thread(combined_property_and_stocks_batch, params)
+            self.batches += 1
+            for (scenario,), part in df.partition_by(
+                "scenario", as_dict=True, maintain_order=True
+            ).items():
+                key = keys[scenario]
+                result = part.drop("scenario")
+                self.cache[key] = result
+                pending[key].set_result(result)
+            cached_rows = sum(df.height for df in self.cache.values())
+            while len(self.cache) > self.cache_size or cached_rows > self.cache_rows:
+                cached_rows -= self.cache.popitem(last=False)[1].height
+        except Exception as exc:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(RequestError("Scenario produced no rows"))
+
+
+class ProjectionService:
+    def __init__(self, batcher: ProjectionBatcher | None = None):
+        self.batcher = batcher or ProjectionBatcher()
+
+    async def handle(self, method: str, path: str, body: dict) -> pl.DataFrame | dict:
+        if method == "GET" and path == "/stats":
+            return {
+                "cache_hits": self.batcher.cache_hits,
+                "cache_misses": self.batcher.cache_misses,
+                "cache_entries": len(self.batcher.cache),
+                "cache_rows": sum(df.height for df in self.batcher.cache.values()),
+                "batches": self.batcher.batches,
+            }
+        if method == "GET" and path == "/metrics":
+            return REGISTRY.snapshot()
+        if method != "POST":
+            raise RequestError(f"Unsupported method {method}")
+        if not isinstance(body, dict):
+            raise RequestError("Request body must be a JSON object")
+        if path == "/combined":
+            return await self.batcher.get(scenario_key(body))
+        if path == "/mortgage":
+            df = await self.batcher.get(mortgage_key(body))
+            return df.select(MORTGAGE_COLUMNS)
+        if path == "/summary":
+            df = await self.batcher.get(scenario_key(body))
+            final = df.row(-1, named=True)
+            return {
+                **monthly_cost_summary(df),
+                "total_net_worth": final["total_net_worth"],
+                "stock_equity": final["stock_equity"],
+                "property_equity": final["property_equity"],
+                "property_value": final["property_value"],
+            }
+        raise FileNotFoundError(path)
+
+    async def serve_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while request_line := await reader.readline():
+                headers = {}
+                try:
+                    method, path, _ = request_line.decode().split(" ", 2)
+                    while (line := await reader.readline()) not in (
+                        b"\r\n",
+                        b"\n",
+                        b"",
+                    ):
+                        name, _, value = line.decode().partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                    length = int(headers.get("content-length", 0))
+                    if length < 0:
+                        raise ValueError(f"Invalid Content-Length {length}")
+                except ValueError as exc:
+                    # the stream can't be resynchronised, so answer and hang up
+                    headers["connection"] = "close"
+                    status, content_type, payload = (
+                        "400 Bad Request",
+                        "application/json",
+                        _json({"error": f"Malformed request: {exc}"}),
+                    )
+                else:
+                    raw = await reader.readexactly(length)
+                    status, content_type, payload = await self._respond(
+                        method, path, raw, headers.get("accept", "")
+                    )
+                writer.write(
+                    f"HTTP/1.1 {status}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(payload)}\r\n\r\n".encode()
+                    + payload
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(
+        self, method: str, path: str, raw: bytes, accept: str
+    ) -> tuple[str, str, bytes]:
+        try:
+            result = await self.handle(method, path, json.loads(raw) if raw else {})
+        except (RequestError, json.JSONDecodeError) as exc:
+            return "400 Bad Request", "application/json", _json({"error": str(exc)})
+        except FileNotFoundError:
+            return "404 Not Found", "application/json", _json({"error": "not found"})
+        except Exception as exc:
+            return "500 Internal Server Error", "application/json", _json(
+                {"error": repr(exc)}
+            )
+        if isinstance(result, dict):
+            return "200 OK", "application/json", _json(result)
+        if ARROW_MIME in accept:
+            buffer = io.BytesIO()
+            result.write_ipc_stream(buffer)
+            return "200 OK", ARROW_MIME, buffer.getvalue()
+        return "200 OK", "application/json", result.write_json().encode()
+
+
+def _json(obj: dict) -> bytes:
+    return json.dumps(obj).encode()
+
+
+async def start_server(
+    host: str = "127.0.0.1", port: int = 8765, service: ProjectionService | None = None
+) -> asyncio.Server:
+    service = service or ProjectionService()
+    return await asyncio.start_server(service.serve_connection, host, port)
+
+
+async def _main(host: str, port: int, metrics: bool) -> None:
+    if metrics:
+        REGISTRY.enable()
+    server = await start_server(host, port)
+    print(f"Serving projections on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local projection service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--metrics", action="store_true", help="Collect engine metrics for /metrics"
+    )
+    args = parser.parse_args()
+    asyncio.run(_main(args.host, args.port, args.metrics))
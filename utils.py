@@ -1,5 +1,10 @@
 import polars as pl
 
+from utils_metrics import instrument
+
+RENTEFRADRAG_RATE = 0.22  # tax deduction on mortgage interest
+STOCK_TAX_RATE = 0.3784  # 37.84% tax on stock returns
+
 
 def apply_inflation(
     df: pl.DataFrame, annual_inflation: float, columns: list[str]
@@ -14,48 +19,61 @@ def apply_inflation(
     return df
 
 
+def _annuity_factor(rate: pl.Expr, n: pl.Expr) -> pl.Expr:
+    # sum of (1 + rate) ** k for k in range(n), i.e. ((1 + rate) ** n - 1) / rate
+    return (
+        pl.when(rate == 0)
+        .then(n.cast(pl.Float64))
+        .otherwise(((1 + rate).pow(n) - 1) / rate)
+    )
+
+
+def _growing_annuity_factor(rate: pl.Expr, growth: pl.Expr, n: pl.Expr) -> pl.Expr:
+    # value after n months of a payment starting at 1 and growing by `growth`
+    # per month, compounded at `rate`: sum of (1 + growth) ** (k - 1) *
+    # (1 + rate) ** (n - k) for k in 1..n
+    return (
+        pl.when(rate == growth)
+        .then(n.cast(pl.Float64) * (1 + rate).pow(n - 1))
+        .otherwise(((1 + rate).pow(n) - (1 + growth).pow(n)) / (rate - growth))
+    )
+
+
+@instrument
 def stock_investment_monthly(
     initial_investment: float,
     monthly_contribution: float,
     annual_return: float,
     years: int,
     annual_inflation: float = 0.0,
-    tax_rate: float = 0.3784,  # 37.84% tax on returns
+    tax_rate: float = STOCK_TAX_RATE,
+    annual_contribution_growth: float = 0.0,
 ) -> pl.DataFrame:
     n_months = years * 12
-    monthly_return = (1 + annual_return) ** (1 / 12) - 1
-    # .3784 # tax on returns
-    balance = [initial_investment]
-    contributions_cum = [initial_investment]
-    returns_cum = [0.0]
+    monthly_return = pl.lit((1 + annual_return) ** (1 / 12) - 1)
+    # contributions grow geometrically, e.g. with salary
+    contribution_growth = pl.lit((1 + annual_contribution_growth) ** (1 / 12) - 1)
+    month = pl.col("month")
 
-    for m in range(1, n_months + 1):
-        # previous balance grows
-        interest = balance[-1] * monthly_return
-        new_balance = balance[-1] + interest
-        # add monthly contribution
-        new_balance += monthly_contribution
-
-        # update cumulative trackers
-        balance.append(new_balance)
-        contributions_cum.append(contributions_cum[-1] + monthly_contribution)
-        returns_cum.append(returns_cum[-1] + interest)
-
-    df = pl.DataFrame(
-        {
-            "month": [int(m) for m in range(n_months + 1)],
-            "year": [int(m // 12) for m in range(n_months + 1)],
-            "balance": balance,
-            "contributions_cum": contributions_cum,
-            "returns_cum": returns_cum,
-        },
-        schema={
-            "month": pl.Int64,
-            "year": pl.Int64,
-            "balance": pl.Float64,
-            "contributions_cum": pl.Float64,
-            "returns_cum": pl.Float64,
-        },
+    df = pl.DataFrame({"month": range(n_months + 1)}, schema={"month": pl.Int64})
+    df = df.with_columns(
+        (month // 12).alias("year"),
+        (
+            initial_investment * (1 + monthly_return).pow(month)
+            + monthly_contribution
+            * _growing_annuity_factor(monthly_return, contribution_growth, month)
+        ).alias("balance"),
+        (
+            initial_investment
+            + monthly_contribution * _annuity_factor(contribution_growth, month)
+        ).alias("contributions_cum"),
+    )
+    df = df.with_columns(
+        (pl.col("balance") - pl.col("contributions_cum")).alias("returns_cum"),
+        pl.when(month >= 1)
+        .then(monthly_contribution * (1 + contribution_growth).pow(month - 1))
+        .otherwise(0.0)
+        .alias("contribution"),
     )
     df = df.with_columns(
         [
@@ -72,6 +90,7 @@ def stock_investment_monthly(
             "balance",
             "contributions_cum",
             "returns_cum",
+            "contribution",
             "returns_after_tax",
             "stock_equity",
         ],
@@ -79,6 +98,7 @@ def stock_investment_monthly(
     return df
 
 
+@instrument
 def property_value_monthly(
     initial_price: float,
     annual_value_change: float,
@@ -111,6 +131,7 @@ def property_value_monthly(
     return df
 
 
+@instrument
 def mortgage_monthly(
     loan_amount: float,
     annual_interest_rate: float,
@@ -140,7 +161,7 @@ def mortgage_monthly(
         principal_payment = loan_payment - interest_payment
         new_balance = max(0, balance[-1] - principal_payment)
 
-        tax_deduction = interest_payment * 0.22 if rentefradrag else 0.0
+        tax_deduction = interest_payment * RENTEFRADRAG_RATE if rentefradrag else 0.0
         net_cost = loan_payment - tax_deduction
 
         balance.append(new_balance)
@@ -192,6 +213,7 @@ def mortgage_monthly(
     return df
 
 
+@instrument
 def property_equity_over_time(
     initial_price: float,
     annual_value_change: float,
@@ -237,6 +259,7 @@ def property_equity_over_time(
     return df
 
 
+@instrument
 def combined_property_and_stocks(
     property_price: float,
     annual_property_appreciation: float,
@@ -249,10 +272,15 @@ def combined_property_and_stocks(
     time_horizon_years: int,
     annual_inflation: float = 0.0,
     rentefradrag: bool = True,
+    monthly_other_property_costs: float = 0.0,
+    annual_contribution_growth: float = 0.0,
+    annual_cost_growth: float = 0.0,
 ) -> pl.DataFrame:
     """
     Combines house equity growth with stock investment returns.
-    Returns a DataFrame with both house equity and stock portfolio values.
+    Returns a DataFrame with both house equity and stock portfolio values,
+    plus the monthly cash outlay (loan payment, other property costs and
+    stock contribution, the latter two growing geometrically).
     """
     # Get house equity over time
     property_df = property_equity_over_time(
@@ -273,6 +301,7 @@ def combined_property_and_stocks(
         annual_return=annual_stock_return,
         years=time_horizon_years,
         annual_inflation=annual_inflation,
+        annual_contribution_growth=annual_contribution_growth,
     )
 
     # Combine the data
@@ -284,6 +313,7 @@ def combined_property_and_stocks(
             "balance": "stock_balance",
             "contributions_cum": "stock_buy_price",
             "returns_cum": "stock_returns",
+            "contribution": "stock_contribution",
         }
     )
 
@@ -292,4 +322,344 @@ def combined_property_and_stocks(
         (pl.col("property_equity") + pl.col("stock_equity")).alias("total_net_worth"),
     )
 
+    # Other property costs grow geometrically, e.g. with inflation
+    cost_growth = pl.lit((1 + annual_cost_growth) ** (1 / 12))
+    combined_df = combined_df.with_columns(
+        pl.when(pl.col("month") >= 1)
+        .then(monthly_other_property_costs * cost_growth.pow(pl.col("month") - 1))
+        .otherwise(0.0)
+        .alias("other_property_costs"),
+    )
+    combined_df = apply_inflation(
+        combined_df, annual_inflation, ["other_property_costs"]
+    )
+    combined_df = combined_df.with_columns(
+        (
+            pl.col("loan_payment")
+            + pl.col("other_property_costs")
+            + pl.col("stock_contribution")
+        ).alias("total_monthly_outlay"),
+    )
+
     return combined_df
+
+
+def monthly_cost_summary(df: pl.DataFrame) -> dict[str, float]:
+    """
+    First-month costs of a `combined_property_and_stocks` projection, before
+    and after the rentefradrag tax deduction.
+    """
+    first = df.row(1, named=True)
+    return {
+        "loan_payment": first["loan_payment"],
+        "monthly_payment": first["total_monthly_outlay"],
+        "net_loan_cost": first["net_cost"],
+        "net_monthly_payment": first["total_monthly_outlay"]
+        - first["loan_payment"]
+        + first["net_cost"],
+    }
+
+
+def _combined_lazy(params: pl.DataFrame) -> pl.LazyFrame:
+    # Closed-form monthly projection for every row of `params`, including
+    # the (deflated) monthly flows used by the yearly rollup.
+    if "scenario" not in params.columns:
+        params = params.with_row_index("scenario")
+    optional = {
+        "annual_inflation": 0.0,
+        "rentefradrag": True,
+        "monthly_other_property_costs": 0.0,
+        "annual_contribution_growth": 0.0,
+        "annual_cost_growth": 0.0,
+    }
+    # absent columns, or nulls where only some scenarios set them, get defaults
+    params = params.with_columns(
+        [
+            pl.col(name).fill_null(default)
+            if name in params.columns
+            else pl.lit(default).alias(name)
+            for name, default in optional.items()
+        ]
+    )
+
+    month = pl.col("month")
+    loan_month = pl.min_horizontal(month, pl.col("n_loan_months"))
+    r = pl.col("r_monthly")
+    in_term = (month >= 1) & (month <= pl.col("n_loan_months"))
+
+    return (
+        params.lazy()
+        .with_columns(
+            pl.int_ranges(0, pl.col("time_horizon_years") * 12 + 1).alias("month"),
+            (pl.col("loan_term_years") * 12).alias("n_loan_months"),
+            (pl.col("annual_interest_rate") / 12.0).alias("r_monthly"),
+            ((1 + pl.col("annual_stock_return")) ** (1 / 12) - 1).alias("g_monthly"),
+            ((1 + pl.col("annual_contribution_growth")) ** (1 / 12) - 1).alias(
+                "contribution_growth"
+            ),
+            ((1 + pl.col("annual_cost_growth")) ** (1 / 12)).alias("cost_growth"),
+            ((1 + pl.col("annual_property_appreciation")) ** (1 / 12)).alias(
+                "property_growth"
+            ),
+            ((1 + pl.col("annual_inflation")) ** (1 / 12)).alias("inflation_growth"),
+        )
+        .with_columns(
+            (
+                pl.col("loan_amount")
+                * (1 + r).pow(pl.col("n_loan_months"))
+                / _annuity_factor(r, pl.col("n_loan_months"))
+            ).alias("payment"),
+        )
+        .explode("month")
+        .with_columns(
+            # unclipped balance after `loan_month` scheduled payments
+            (
+                pl.col("loan_amount") * (1 + r).pow(loan_month)
+                - pl.col("payment") * _annuity_factor(r, loan_month)
+            ).alias("balance_raw"),
+            (
+                pl.col("loan_amount") * (1 + r).pow(month - 1)
+                - pl.col("payment") * _annuity_factor(r, month - 1)
+            )
+            .clip(lower_bound=0)
+            .alias("balance_prev"),
+            (
+                pl.col("initial_stock_investment")
+                * (1 + pl.col("g_monthly")).pow(month)
+                + pl.col("monthly_stock_investment")
+                * _growing_annuity_factor(
+                    pl.col("g_monthly"), pl.col("contribution_growth"), month
+                )
+            ).alias("stock_balance"),
+            (
+                pl.col("initial_stock_investment")
+                + pl.col("monthly_stock_investment")
+                * _annuity_factor(pl.col("contribution_growth"), month)
+            ).alias("stock_buy_price"),
+            pl.when(month >= 1)
+            .then(
+                (
+                    pl.col("initial_stock_investment")
+                    * (1 + pl.col("g_monthly")).pow(month - 1)
+                    + pl.col("monthly_stock_investment")
+                    * _growing_annuity_factor(
+                        pl.col("g_monthly"), pl.col("contribution_growth"), month - 1
+                    )
+                )
+                * pl.col("g_monthly")
+            )
+            .otherwise(0.0)
+            .alias("stock_return"),
+            pl.when(month >= 1)
+            .then(
+                pl.col("monthly_stock_investment")
+                * (1 + pl.col("contribution_growth")).pow(month - 1)
+            )
+            .otherwise(0.0)
+            .alias("stock_contribution"),
+            pl.when(month >= 1)
+            .then(
+                pl.col("monthly_other_property_costs")
+                * pl.col("cost_growth").pow(month - 1)
+            )
+            .otherwise(0.0)
+            .alias("other_property_costs"),
+            pl.col("inflation_growth").pow(month).alias("deflator"),
+            pl.col("inflation_growth").pow(loan_month).alias("loan_deflator"),
+        )
+        .with_columns(
+            (pl.col("property_price") * pl.col("property_growth").pow(month)).alias(
+                "property_value"
+            ),
+            pl.when(in_term)
+            .then(pl.col("payment"))
+            .otherwise(0.0)
+            .alias("loan_payment"),
+            pl.when(in_term)
+            .then(pl.col("balance_prev") * r)
+            .when(month == 0)
+            .then(0.0)
+            .alias("interest"),
+            pl.when(month <= pl.col("n_loan_months"))
+            .then(pl.col("balance_raw").clip(lower_bound=0))
+            .otherwise(0.0)
+            .alias("loan_balance"),
+            (pl.col("loan_amount") - pl.col("balance_raw")).alias("principal_cum"),
+            (
+                pl.col("payment") * loan_month
+                - (pl.col("loan_amount") - pl.col("balance_raw"))
+            ).alias("interest_cum"),
+            (pl.col("stock_balance") - pl.col("stock_buy_price")).alias(
+                "stock_returns"
+            ),
+            pl.when(in_term)
+            .then(pl.col("payment") - pl.col("balance_prev") * r)
+            .otherwise(0.0)
+            .alias("principal_paid"),
+        )
+        .with_columns(
+            pl.when(pl.col("rentefradrag"))
+            .then(pl.col("interest") * RENTEFRADRAG_RATE)
+            .otherwise(pl.col("interest") * 0.0)
+            .alias("tax_deduction"),
+        )
+        .with_columns(
+            pl.when(month == 0)
+            .then(0.0)
+            .otherwise(pl.col("loan_payment") - pl.col("tax_deduction"))
+            .alias("net_cost"),
+            (pl.col("stock_returns") * (1 - STOCK_TAX_RATE)).alias("returns_after_tax"),
+        )
+        .with_columns(
+            (pl.col("stock_buy_price") + pl.col("returns_after_tax")).alias(
+                "stock_equity"
+            ),
+        )
+        .with_columns(
+            [
+                pl.col(col) / pl.col("deflator")
+                for col in [
+                    "property_value",
+                    "loan_payment",
+                    "interest",
+                    "tax_deduction",
+                    "net_cost",
+                    "loan_balance",
+                    "stock_balance",
+                    "stock_buy_price",
+                    "stock_returns",
+                    "returns_after_tax",
+                    "stock_equity",
+                    "principal_paid",
+                    "stock_contribution",
+                    "stock_return",
+                    "other_property_costs",
+                ]
+            ]
+            + [
+                pl.col(col) / pl.col("loan_deflator")
+                for col in ["principal_cum", "interest_cum"]
+            ]
+        )
+        .with_columns(
+            (month // 12).alias("year"),
+            (pl.col("property_value") - pl.col("loan_balance")).alias(
+                "property_equity"
+            ),
+        )
+        .with_columns(
+            (pl.col("property_equity") + pl.col("stock_equity")).alias(
+                "total_net_worth"
+            ),
+            (
+                pl.col("loan_payment")
+                + pl.col("other_property_costs")
+                + pl.col("stock_contribution")
+            ).alias("total_monthly_outlay"),
+        )
+    )
+
+
+MONTHLY_COLUMNS = [
+    "scenario",
+    "month",
+    "year",
+    "property_value",
+    "loan_payment",
+    "interest",
+    "tax_deduction",
+    "net_cost",
+    "loan_balance",
+    "principal_cum",
+    "interest_cum",
+    "property_equity",
+    "stock_balance",
+    "stock_buy_price",
+    "stock_returns",
+    "stock_contribution",
+    "returns_after_tax",
+    "stock_equity",
+    "total_net_worth",
+    "other_property_costs",
+    "total_monthly_outlay",
+]
+# summed over each year
+YEARLY_FLOW_COLUMNS = [
+    "loan_payment",
+    "interest",
+    "tax_deduction",
+    "net_cost",
+    "principal_paid",
+    "stock_contribution",
+    "stock_return",
+    "other_property_costs",
+    "total_monthly_outlay",
+]
+# value at the end of each year
+YEARLY_LEVEL_COLUMNS = [
+    "property_value",
+    "loan_balance",
+    "principal_cum",
+    "interest_cum",
+    "property_equity",
+    "stock_balance",
+    "stock_buy_price",
+    "stock_returns",
+    "returns_after_tax",
+    "stock_equity",
+    "total_net_worth",
+]
+
+
+@instrument
+def combined_property_and_stocks_batch(params: pl.DataFrame) -> pl.DataFrame:
+    """
+    Vectorized `combined_property_and_stocks` for many scenarios at once.
+
+    `params` has one row per scenario with columns named like the arguments
+    of `combined_property_and_stocks`; `annual_inflation`, `rentefradrag`,
+    `monthly_other_property_costs`, `annual_contribution_growth` and
+    `annual_cost_growth` are optional and default like the scalar function's
+    arguments. Uses the closed-form annuity expressions instead of the
+    monthly loop and returns the same columns plus a `scenario` id (taken
+    from `params` if present, otherwise the row index).
+    """
+    return _combined_lazy(params).select(MONTHLY_COLUMNS).collect()
+
+
+@instrument
+def combined_property_and_stocks_batch_with_yearly(
+    params: pl.DataFrame,
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """
+    Like `combined_property_and_stocks_batch`, but also returns a yearly
+    rollup computed from the same plan: `year_end` k covers months
+    12k-11..12k (0 is the starting point), flows are summed and balances are
+    taken at month 12k. This differs from the monthly `year` (`month // 12`),
+    so join the two frames on `month` rather than on the year.
+    """
+    lf = _combined_lazy(params)
+    yearly = (
+        lf.with_columns(((pl.col("month") + 11) // 12).alias("year_end"))
+        .group_by("scenario", "year_end", maintain_order=True)
+        .agg(
+            [pl.col(col).sum() for col in YEARLY_FLOW_COLUMNS]
+            + [pl.col(col).last() for col in YEARLY_LEVEL_COLUMNS]
+        )
+    )
+    monthly, yearly = pl.collect_all([lf.select(MONTHLY_COLUMNS), yearly])
+    return monthly, yearly
+
+
+@instrument
+def combined_property_and_stocks_with_yearly(
+    **kwargs,
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """
+    Single-scenario `combined_property_and_stocks_batch_with_yearly`, taking
+    the keyword arguments of `combined_property_and_stocks`.
+    """
+    monthly, yearly = combined_property_and_stocks_batch_with_yearly(
+        pl.DataFrame([kwargs])
+    )
+    return monthly.drop("scenario"), yearly.drop("scenario")
@@ -2,6 +2,8 @@ import polars as pl
 import streamlit as st
 from millify import millify
 
+from utils import monthly_cost_summary
+
 
 def scenario_sliders(scenario: str):
     st.subheader(f"Scenario {scenario}:")
@@ -57,14 +59,13 @@ def scenario_sliders(scenario: str):
 
 def stats_components(
     df_scenario: pl.DataFrame,
-    monthly_stock_investment: float,
-    monthly_other_property_costs: float,
     scenario: str,
     property_price: float,
     loan_amount: float,
     initial_stock_investment: float,
 ):
     initial_equity = property_price - loan_amount + initial_stock_investment
+    costs = monthly_cost_summary(df_scenario)
 
     st.metric(
         label=f"Initial equity - {scenario}",
@@ -75,16 +76,11 @@ def stats_components(
         st.subheader("Monthly costs")
         st.metric(
             label=f"Monthly loan payment - {scenario}",
-            value=millify(df_scenario["loan_payment"][1], precision=1),
+            value=millify(costs["loan_payment"], precision=1),
         )
         st.metric(
             label=f"Monthly payment - {scenario}",
-            value=millify(
-                monthly_stock_investment
-                + df_scenario["loan_payment"][1]
-                + monthly_other_property_costs,
-                precision=1,
-            ),
+            value=millify(costs["monthly_payment"], precision=1),
             help="Stock investment + loan payment + other property costs",
         )
 
@@ -92,17 +88,12 @@ def stats_components(
         st.subheader("Costs after tax deduction")
         st.metric(
             label=f"Real loan cost - {scenario}",
-            value=millify(df_scenario["net_cost"][1], precision=1),
+            value=millify(costs["net_loan_cost"], precision=1),
             help="After tax deduction",
         )
         st.metric(
             label=f"Real monthly payment - {scenario}",
-            value=millify(
-                monthly_stock_investment
-                + df_scenario["net_cost"][1]
-                + monthly_other_property_costs,
-                precision=1,
-            ),
+            value=millify(costs["net_monthly_payment"], precision=1),
             help="Stock investment + loan payment after tax deduction + other property costs",
         )
 
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+from utils import combined_property_and_stocks_batch
+
+MANIFEST = "manifest.json"
+
+
+def _project(params: pl.DataFrame, rng: np.random.Generator) -> pl.DataFrame:
+    return combined_property_and_stocks_batch(params)
+
+
+def _params_digest(params: pl.DataFrame) -> str:
+    # row hashes are only stable within one polars version, which is enough
+    # to tell a resumed job from a different one
+    digest = hashlib.sha256(str(params.schema).encode())
+    digest.update(params.hash_rows().to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _write_atomic(path: Path, write: Callable[[Path], None]) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def run_sweep(
+    params: pl.DataFrame,
+    out_dir: str | Path,
+    shard_size: int = 1_000,
+    seed: int = 0,
+    shard_fn: Callable[[pl.DataFrame, np.random.Generator], pl.DataFrame] = _project,
+) -> pl.LazyFrame:
+    """
+    Run `shard_fn` over `params` in shards of `shard_size` rows, writing each
+    finished shard to `out_dir` as Parquet and recording it in a manifest.
+
+    Every shard gets a `scenario` id range and a random generator seeded from
+    (`seed`, shard index) only, so rerunning after a crash computes just the
+    missing shards and produces the same files as an uninterrupted run.
+    Returns a lazy scan over all shards in scenario order.
+    """
+    if params.is_empty():
+        raise ValueError("params has no scenarios to run")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if "scenario" not in params.columns:
+        params = params.with_row_index("scenario")
+    n_shards = -(-params.height // shard_size)
+
+    job = {
+        "n_scenarios": params.height,
+        "shard_size": shard_size,
+        "seed": seed,
+        "shard_fn": f"{shard_fn.__module__}.{shard_fn.__qualname__}",
+        "params_sha256": _params_digest(params),
+    }
+    manifest_path = out_dir / MANIFEST
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text())
+        if manifest["job"] != job:
+            raise ValueError(
+                f"{out_dir} holds a different job; use a new directory to start over"
+            )
+    else:
+        manifest = {"job": job, "shards": {}}
+
+    files = []
+    for shard in range(n_shards):
+        path = out_dir / f"shard-{shard:06d}.parquet"
+        files.append(path)
+        if str(shard) in manifest["shards"] and path.exists():
+            continue
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(shard,)))
+        result = shard_fn(params.slice(shard * shard_size, shard_size), rng)
+        _write_atomic(path, result.write_parquet)
+        manifest["shards"][str(shard)] = {"file": path.name, "rows": result.height}
+        _write_atomic(
+            manifest_path, lambda tmp: tmp.write_text(json.dumps(manifest, indent=2))
+        )
+
+    return pl.scan_parquet(files)
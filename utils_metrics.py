@@ -0,0 +1,241 @@
+import functools
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+# cProfile and tracemalloc are process-wide, so only one sampled call may
+# profile at a time; the others (including nested calls) run unprofiled
+_PROFILE_LOCK = threading.Lock()
+
+
+def _rows(result) -> int:
+    # DataFrame results, or (monthly, yearly) tuples counted by their first frame
+    if isinstance(result, tuple):
+        result = result[0]
+    return getattr(result, "height", 0)
+
+
+def _labels(labels: tuple) -> str:
+    return ",".join(f'{key}="{value}"' for key, value in labels)
+
+
+class Registry:
+    """
+    Counters and latency histograms for the projection engine.
+
+    Disabled by default; while disabled, instrumented functions cost one
+    attribute check per call and `inc`/`observe` return immediately.
+    """
+
+    def __init__(self, prefix: str = "invest_calc", buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._profile: dict | None = None
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters: dict[tuple[str, tuple], float] = {}
+            self._histograms: dict[tuple[str, tuple], list] = {}
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def enable_profiling(
+        self,
+        out_dir: str | Path,
+        threshold_seconds: float = 1.0,
+        sample_rate: float = 0.01,
+        trace_memory: bool = False,
+    ) -> None:
+        """
+        Run a `sample_rate` fraction of instrumented calls under cProfile (and
+        tracemalloc if `trace_memory`), keeping the dump of those slower than
+        `threshold_seconds` in `out_dir`.
+        """
+        Path(out_dir).mkdir(parents=True, exist_ok=True)
+        self._profile = {
+            "out_dir": Path(out_dir),
+            "threshold": threshold_seconds,
+            "sample_rate": sample_rate,
+            "trace_memory": trace_memory,
+        }
+
+    def disable_profiling(self) -> None:
+        self._profile = None
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            # [bucket counts..., count, sum]
+            hist = self._histograms.setdefault(key, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    hist[i] += 1
+            hist[-2] += 1
+            hist[-1] += value
+
+    def instrument(self, fn=None, *, name: str | None = None):
+        """Decorator counting calls, latency and rows produced by `fn`."""
+        if fn is None:
+            return functools.partial(self.instrument, name=name)
+        name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return fn(*args, **kwargs)
+            return self._timed_call(name, fn, args, kwargs)
+
+        return wrapper
+
+    def _timed_call(self, name: str, fn, args, kwargs):
+        profile = self._profile
+        if (
+            profile is not None
+            and random.random() < profile["sample_rate"]
+            and _PROFILE_LOCK.acquire(blocking=False)
+        ):
+            try:
+                return self._profiled_call(name, fn, args, kwargs, profile)
+            finally:
+                _PROFILE_LOCK.release()
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self._record(name, time.perf_counter() - start, result)
+        return result
+
+    def _profiled_call(self, name: str, fn, args, kwargs, profile: dict):
+        import cProfile
+        import pstats
+        import tracemalloc
+
+        profiler = cProfile.Profile()
+        try:
+            # fails if a profiler outside the registry is already running
+            profiler.enable()
+        except ValueError:
+            start = time.perf_counter()
+            result = fn(*args, **kwargs)
+            self._record(name, time.perf_counter() - start, result)
+            return result
+        trace_memory = profile["trace_memory"] and not tracemalloc.is_tracing()
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            profiler.disable()
+            memory = tracemalloc.take_snapshot() if trace_memory else None
+            if trace_memory:
+                tracemalloc.stop()
+        self._record(name, elapsed, result)
+        if elapsed >= profile["threshold"]:
+            stem = profile["out_dir"] / f"{name}-{time.time_ns()}"
+            profiler.dump_stats(f"{stem}.prof")
+            with open(f"{stem}.txt", "w") as f:
+                f.write(f"{name}: {elapsed:.3f} s\n\n")
+                pstats.Stats(profiler, stream=f).sort_stats("cumulative").print_stats(
+                    25
+                )
+                if memory is not None:
+                    f.write("Top allocations:\n")
+                    for stat in memory.statistics("lineno")[:25]:
+                        f.write(f"{stat}\n")
+        return result
+
+    def _record(self, name: str, elapsed: float, result) -> None:
+        self.inc("calls_total", function=name)
+        self.inc("rows_total", _rows(result), function=name)
+        self.observe("seconds", elapsed, function=name)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(hist) for key, hist in self._histograms.items()}
+        snapshot = {"counters": {}, "histograms": {}, "derived": {}}
+        for (name, labels), value in counters.items():
+            snapshot["counters"].setdefault(name, {})[_labels(labels)] = value
+        for (name, labels), hist in histograms.items():
+            snapshot["histograms"].setdefault(name, {})[_labels(labels)] = {
+                "buckets": dict(zip(map(str, self.buckets), hist[:-2])),
+                "count": hist[-2],
+                "sum": hist[-1],
+            }
+
+        # scenario-months per second of engine time, and cache hit rates
+        rows = snapshot["counters"].get("rows_total", {})
+        seconds = snapshot["histograms"].get("seconds", {})
+        snapshot["derived"]["rows_per_second"] = {
+            labels: rows.get(labels, 0.0) / hist["sum"]
+            for labels, hist in seconds.items()
+            if hist["sum"] > 0
+        }
+        hits = snapshot["counters"].get("cache_hits_total", {})
+        misses = snapshot["counters"].get("cache_misses_total", {})
+        snapshot["derived"]["cache_hit_rate"] = {
+            labels: hits.get(labels, 0.0)
+            / (hits.get(labels, 0.0) + misses.get(labels, 0.0))
+            for labels in set(hits) | set(misses)
+        }
+        return snapshot
+
+    def to_prometheus(self) -> str:
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            metric = f"{self.prefix}_{name}"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{{{_labels(labels)}}} {value}")
+        for (name, labels), hist in histograms:
+            metric = f"{self.prefix}_{name}"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            for bound, count in zip((*self.buckets, "+Inf"), (*hist[:-2], hist[-2])):
+                bucket_labels = _labels((*labels, ("le", bound)))
+                lines.append(f"{metric}_bucket{{{bucket_labels}}} {count}")
+            lines.append(f"{metric}_count{{{_labels(labels)}}} {hist[-2]}")
+            lines.append(f"{metric}_sum{{{_labels(labels)}}} {hist[-1]}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str | Path) -> None:
+        """Atomically write a `.json` snapshot or a Prometheus text file."""
+        path = Path(path)
+        if path.suffix == ".json":
+            text = json.dumps(self.snapshot(), indent=2)
+        else:
+            text = self.to_prometheus()
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(text)
+        os.replace(tmp, path)
+
+
+REGISTRY = Registry()
+instrument = REGISTRY.instrument
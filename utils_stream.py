@@ -0,0 +1,144 @@
+import itertools
+from collections.abc import Callable, Iterable, Iterator
+
+import numpy as np
+import polars as pl
+
+from utils import combined_property_and_stocks_batch
+
+
+def stream_projections(
+    params: Iterable[dict],
+    chunk_size: int = 1_000,
+    engine: Callable[[pl.DataFrame], pl.DataFrame] = combined_property_and_stocks_batch,
+    columns: list[str] | None = None,
+    final_month_only: bool = False,
+    as_arrow: bool = False,
+) -> Iterator[pl.DataFrame]:
+    """
+    Lazily project an iterable of parameter sets, `chunk_size` scenarios at a
+    time. Only one chunk of parameters and results is held in memory, so the
+    iterable may be a generator over millions of scenarios.
+
+    Each yielded chunk carries a global `scenario` id (position in `params`).
+    With `final_month_only` only the last month of every scenario is kept;
+    with `as_arrow` the chunks are yielded as `pyarrow.RecordBatch` instead.
+    """
+    params_iter = iter(params)
+    offset = 0
+    while True:
+        batch = list(itertools.islice(params_iter, chunk_size))
+        if not batch:
+            return
+        # scan every dict so optional keys first seen late in a chunk are kept
+        chunk_params = pl.DataFrame(batch, infer_schema_length=None).with_row_index(
+            "scenario", offset=offset
+        )
+        offset += len(batch)
+        chunk = engine(chunk_params)
+        if final_month_only:
+            chunk = chunk.filter(
+                pl.col("month") == pl.col("month").max().over("scenario")
+            )
+        if columns is not None:
+            chunk = chunk.select(["scenario", "month", *columns])
+        if as_arrow:
+            yield from chunk.to_arrow().to_batches()
+        else:
+            yield chunk
+
+
+class RunningStats:
+    """Streaming count/mean/variance of a column (Chan et al. chunk merge)."""
+
+    def __init__(self, column: str):
+        self.column = column
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, chunk: pl.DataFrame) -> None:
+        values = chunk[self.column].drop_nulls()
+        n = values.len()
+        if n == 0:
+            return
+        chunk_mean = values.mean()
+        chunk_m2 = ((values - chunk_mean) ** 2).sum()
+        total = self.count + n
+        delta = chunk_mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += chunk_m2 + delta**2 * self.count * n / total
+        self.count = total
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return self.variance**0.5
+
+
+class QuantileSketch:
+    """
+    Fixed-size uniform reservoir sample of a column (Algorithm R), so memory
+    stays at `capacity` values however long the stream is.
+    """
+
+    def __init__(self, column: str, capacity: int = 100_000, seed: int = 0):
+        self.column = column
+        self.capacity = capacity
+        self.count = 0
+        self._sample = np.empty(capacity, dtype=np.float64)
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, chunk: pl.DataFrame) -> None:
+        values = chunk[self.column].drop_nulls().to_numpy()
+        n_fill = min(max(self.capacity - self.count, 0), len(values))
+        self._sample[self.count : self.count + n_fill] = values[:n_fill]
+        rest = values[n_fill:]
+        if len(rest):
+            # item with global index t replaces a random slot w.p. capacity / (t + 1);
+            # later items win on slot collisions, matching the sequential algorithm
+            t = self.count + n_fill + np.arange(len(rest))
+            slots = (self._rng.random(len(rest)) * (t + 1)).astype(np.int64)
+            keep = slots < self.capacity
+            self._sample[slots[keep]] = rest[keep]
+        self.count += len(values)
+
+    def quantile(self, q: float | list[float]) -> float | list[float]:
+        sample = self._sample[: min(self.count, self.capacity)]
+        return np.quantile(sample, q).tolist()
+
+
+class ArgMax:
+    """Tracks the row with the largest value of a column across the stream."""
+
+    def __init__(self, column: str, key: str = "scenario"):
+        self.column = column
+        self.key = key
+        self.value = None
+        self.row: dict | None = None
+
+    def update(self, chunk: pl.DataFrame) -> None:
+        values = chunk[self.column]
+        if values.null_count() == values.len():
+            return
+        idx = values.arg_max()
+        if self.value is None or values[idx] > self.value:
+            self.value = values[idx]
+            self.row = chunk.row(idx, named=True)
+
+    @property
+    def argmax(self):
+        return None if self.row is None else self.row[self.key]
+
+
+def consume(stream: Iterable, *aggregators) -> tuple:
+    """Feed every chunk of `stream` to each aggregator and return them."""
+    for chunk in stream:
+        if not isinstance(chunk, pl.DataFrame):
+            chunk = pl.from_arrow(chunk)
+        for aggregator in aggregators:
+            aggregator.update(chunk)
+    return aggregators